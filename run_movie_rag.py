@@ -1,8 +1,9 @@
 import sys
 import os
+import asyncio
 import json
 import getpass
-from typing import List
+from typing import List, Dict, Any
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -54,6 +55,51 @@ def get_default_queries() -> List[str]:
         "Romantic comedies from the 2000s"
     ]
 
+def save_response(i: int, query: str, response: Dict[str, Any]):
+    """Display a query result and save it to the results directory"""
+    print(f"\n{i}. Query: {query}")
+    print("-" * 50)
+    
+    # Display results
+    print(f"Answer: {response['answer']}")
+    print(f"Reasoning: {response['reasoning']}")
+    print(f"Retrieved {len(response['contexts'])} context chunks")
+    
+    # Save results
+    output_file = f"results/query_{i:02d}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(response, f, indent=2, ensure_ascii=False)
+    
+    print(f"💾 Saved to: {output_file}")
+    print("=" * 50)
+
+async def process_queries(rag_system: MovieRAGSystem, queries: List[str], max_concurrency: int) -> int:
+    """Run queries concurrently, bounded by a semaphore to respect API rate limits.
+    
+    Each result is displayed and saved as soon as its query finishes, so one failing
+    query does not discard the others. Returns the number of failed queries.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def run_query(i: int, query: str) -> bool:
+        try:
+            async with semaphore:
+                response = await rag_system.query_async(query)
+            save_response(i, query, response)
+        except Exception as e:
+            print(f"\n{i}. Query failed: {query}")
+            print(f"Error: {e}")
+            print("=" * 50)
+            return False
+        
+        return True
+    
+    outcomes = await asyncio.gather(
+        *(run_query(i, query) for i, query in enumerate(queries, 1)),
+        return_exceptions=True
+    )
+    return sum(1 for outcome in outcomes if outcome is not True)
+
 def main():
     """Main entry point for the Movie RAG system"""
     print("🎥 Movie Plot RAG System")
@@ -77,26 +123,13 @@ def main():
     print(f"\nProcessing {len(queries)} queries...")
     print("=" * 50)
     
-    # Process each query
-    for i, query in enumerate(queries, 1):
-        print(f"\n{i}. Query: {query}")
-        print("-" * 50)
-        
-        # Get response from RAG system
-        response = rag_system.query(query)
-        
-        # Display results
-        print(f"Answer: {response['answer']}")
-        print(f"Reasoning: {response['reasoning']}")
-        print(f"Retrieved {len(response['contexts'])} context chunks")
-        
-        # Save results
-        output_file = f"results/query_{i:02d}.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(response, f, indent=2, ensure_ascii=False)
-        
-        print(f"💾 Saved to: {output_file}")
-        print("=" * 50)
+    # Load or build the vector store once, before queries run concurrently
+    rag_system.initialize()
+    
+    # Get responses from RAG system; each result is saved as soon as it is ready
+    failures = asyncio.run(process_queries(rag_system, queries, config.MAX_CONCURRENT_QUERIES))
+    if failures:
+        print(f"\n{failures} of {len(queries)} queries failed.")
     
     print(f"\nAll done! Processed {len(queries)} queries.")
     print("Results saved in the 'results/' directory")
@@ -0,0 +1,68 @@
+from typing import List, Dict, Any, Iterator, Sequence, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+class TextColumn:
+    """Read-only list-like view over a memory-mapped Arrow string column"""
+
+    def __init__(self, column: pa.ChunkedArray):
+        self.column = column
+
+    def __len__(self) -> int:
+        return len(self.column)
+
+    def __getitem__(self, i: int) -> str:
+        return self.column[int(i)].as_py()
+
+    def __iter__(self) -> Iterator[str]:
+        for value in self.column:
+            yield value.as_py()
+
+def save_chunks(path: str, chunk_texts: Sequence[str], chunk_doc_ids: np.ndarray):
+    """Write chunk text and owning document id as an uncompressed Arrow IPC file so it can be memory-mapped"""
+    table = pa.table({
+        'content': pa.array(list(chunk_texts), type=pa.string()),
+        'doc_id': pa.array(chunk_doc_ids, type=pa.int32())
+    })
+    feather.write_feather(table, path, compression='uncompressed')
+
+def load_chunks(path: str) -> Tuple[TextColumn, np.ndarray]:
+    """Memory-map saved chunks; text is only materialized when accessed"""
+    table = feather.read_table(path, memory_map=True)
+    chunk_doc_ids = table.column('doc_id').to_numpy().astype(np.int32, copy=False)
+    return TextColumn(table.column('content')), chunk_doc_ids
+
+# Explicit schema: inferring types would fail on a mix of int years and 'Unknown'
+DOCUMENT_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('year', pa.int64()),
+    ('genres', pa.list_(pa.string()))
+])
+
+UNKNOWN_YEAR = 'Unknown'
+
+def _year_to_arrow(year: Any):
+    """Store years as nullable ints; anything that isn't a year becomes null"""
+    if isinstance(year, int):
+        return year
+    if isinstance(year, str) and year.strip().isdigit():
+        return int(year)
+    return None
+
+def save_documents(path: str, documents: List[Dict[str, Any]]):
+    """Write per-document metadata (stored once, referenced by chunk doc_id)"""
+    rows = [{
+        'title': doc.get('title'),
+        'year': _year_to_arrow(doc.get('year')),
+        'genres': list(doc.get('genres') or [])
+    } for doc in documents]
+    table = pa.Table.from_pylist(rows, schema=DOCUMENT_SCHEMA)
+    feather.write_feather(table, path, compression='uncompressed')
+
+def load_documents(path: str) -> List[Dict[str, Any]]:
+    documents = feather.read_table(path).to_pylist()
+    for doc in documents:
+        if doc['year'] is None:
+            doc['year'] = UNKNOWN_YEAR
+    return documents
@@ -1,7 +1,81 @@
 import re
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any
 from .config import Config
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# A sentence is a run of text up to its terminal punctuation (or the end of the text)
+SENTENCE_RE = re.compile(r'[^.!?]+(?:[.!?]+|$)')
+
+def split_sentences_regex(content: str) -> List[str]:
+    return [m.group(0).strip() for m in SENTENCE_RE.finditer(content) if not m.group(0).isspace()]
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def find_sentence_spans(buf: np.ndarray) -> np.ndarray:
+        """(start, end) byte offsets of each SENTENCE_RE match: a run of non-punctuation
+        bytes plus the run of '.', '!' or '?' that follows it. Punctuation with no
+        preceding text is skipped, as the regex does."""
+        length = buf.shape[0]
+        spans = np.empty((length, 2), dtype=np.int64)
+        n = 0
+        i = 0
+        while i < length:
+            c = buf[i]
+            if c == 46 or c == 33 or c == 63:
+                i += 1
+                continue
+            start = i
+            while i < length and not (buf[i] == 46 or buf[i] == 33 or buf[i] == 63):
+                i += 1
+            while i < length and (buf[i] == 46 or buf[i] == 33 or buf[i] == 63):
+                i += 1
+            spans[n, 0] = start
+            spans[n, 1] = i
+            n += 1
+        return spans[:n]
+
+def split_sentences_numba(content: str) -> List[str]:
+    # '.', '!' and '?' are single bytes that never occur inside a multi-byte UTF-8
+    # sequence, so byte offsets always fall on character boundaries
+    data = content.encode('utf-8')
+    sentences = []
+    for start, end in find_sentence_spans(np.frombuffer(data, dtype=np.uint8)):
+        sentence = data[start:end].decode('utf-8')
+        if not sentence.isspace():
+            sentences.append(sentence.strip())
+    return sentences
+
+# Edge cases where a naive punctuation scan would diverge from SENTENCE_RE
+_SPLIT_CHECK_SAMPLES = [
+    "...Hello. World", "Hi. ... there", "", "   ", "No punctuation",
+    "Wait?! Really... Yes.  ", "Café. Naïve? Ünïcode!", "a.. .b", ". . .", "x\n\n. y"
+]
+
+_numba_split_ok = None
+
+def use_numba_split() -> bool:
+    """Whether the Numba splitter is installed and agrees with the regex on known edge cases.
+    
+    Chunk text (and so the index) must not depend on whether numba is installed.
+    """
+    global _numba_split_ok
+    if _numba_split_ok is None:
+        _numba_split_ok = NUMBA_AVAILABLE and all(
+            split_sentences_numba(sample) == split_sentences_regex(sample)
+            for sample in _SPLIT_CHECK_SAMPLES
+        )
+        if NUMBA_AVAILABLE and not _numba_split_ok:
+            print("Warning: Numba sentence splitter disagrees with regex; using regex")
+    return _numba_split_ok
+
 class SmartChunker:
     def __init__(self, config: Config):
         self.config = config
@@ -10,14 +84,31 @@ class SmartChunker:
         """Chunk documents using smart strategy"""
         chunks = []
         
-        for doc in documents:
-            doc_chunks = self._chunk_document(doc)
+        # Documents are independent, so very large corpora can be fanned out across processes
+        if self.config.PARALLEL_CHUNKING and self._total_chars(documents) >= self.config.PARALLEL_CHUNKING_MIN_CHARS:
+            workers = os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunksize = max(1, len(documents) // (workers * 4))
+                for doc_chunks in executor.map(self._chunk_document, documents, range(len(documents)), chunksize=chunksize):
+                    chunks.extend(doc_chunks)
+            return chunks
+        
+        for doc_id, doc in enumerate(documents):
+            doc_chunks = self._chunk_document(doc, doc_id)
             chunks.extend(doc_chunks)
         
         return chunks
     
-    def _chunk_document(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Chunk a single document using smart strategies"""
+    def _total_chars(self, documents: List[Dict[str, Any]]) -> int:
+        """Corpus size in characters (cheap proxy for chunking work)"""
+        return sum(len(doc['content']) for doc in documents)
+    
+    def _chunk_document(self, document: Dict[str, Any], doc_id: int) -> List[Dict[str, Any]]:
+        """Chunk a single document using smart strategies.
+        
+        Chunks reference their document by doc_id (its position in the documents list)
+        instead of carrying a copy of its metadata.
+        """
         content = document['content']
         words = content.split()
         
@@ -25,16 +116,15 @@ class SmartChunker:
             # No need to chunk
             return [{
                 'content': content,
-                'metadata': document['metadata'],
-                'chunk_id': f"{document['metadata']['title']}_0"
+                'doc_id': doc_id
             }]
         
         if self.config.SMART_CHUNKING:
-            return self._semantic_chunking(content, document)
+            return self._semantic_chunking(content, doc_id)
         else:
-            return self._fixed_size_chunking(content, document)
+            return self._fixed_size_chunking(content, doc_id)
     
-    def _fixed_size_chunking(self, content: str, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _fixed_size_chunking(self, content: str, doc_id: int) -> List[Dict[str, Any]]:
         """Fixed-size chunking with overlap"""
         words = content.split()
         chunks = []
@@ -45,8 +135,7 @@ class SmartChunker:
             
             chunks.append({
                 'content': chunk_text,
-                'metadata': document['metadata'],
-                'chunk_id': f"{document['metadata']['title']}_{i//self.config.CHUNK_SIZE}"
+                'doc_id': doc_id
             })
             
             if i + self.config.CHUNK_SIZE >= len(words):
@@ -54,46 +143,54 @@ class SmartChunker:
         
         return chunks
     
-    def _semantic_chunking(self, content: str, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _split_sentences(self, content: str) -> List[str]:
+        """Split text into sentences, keeping their terminal punctuation.
+        
+        The Numba byte scanner is only meant for large corpora with long documents; on the
+        shipped data it is no faster than the regex (the per-sentence decode dominates), and
+        no shipped plot is long enough to reach semantic chunking at all. Both paths give
+        identical output.
+        """
+        if use_numba_split():
+            return split_sentences_numba(content)
+        return split_sentences_regex(content)
+    
+    def _semantic_chunking(self, content: str, doc_id: int) -> List[Dict[str, Any]]:
         """Smart chunking that respects sentence boundaries and narrative structure"""
         # Split into sentences first
-        sentences = re.split(r'[.!?]+', content)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        sentences = self._split_sentences(content)
+        
+        # Count words once per sentence; chunks are tracked as sentence indices
+        sent_word_counts = [len(s.split()) for s in sentences]
         
         chunks = []
-        current_chunk = []
+        current_chunk_indices = []
         current_length = 0
         
-        for sentence in sentences:
-            sentence_words = sentence.split()
-            sentence_length = len(sentence_words)
-            
+        for idx, sentence_length in enumerate(sent_word_counts):
             # If adding this sentence exceeds chunk size and we have content, save current chunk
             if (current_length + sentence_length > self.config.CHUNK_SIZE and 
                 current_length > 0):
                 
-                chunk_text = ' '.join(current_chunk)
+                chunk_text = ' '.join(sentences[i] for i in current_chunk_indices)
                 chunks.append({
                     'content': chunk_text,
-                    'metadata': document['metadata'],
-                    'chunk_id': f"{document['metadata']['title']}_{len(chunks)}"
+                    'doc_id': doc_id
                 })
                 
                 # Keep some overlap by carrying over the last few sentences
-                overlap_sentences = current_chunk[-2:] if len(current_chunk) >= 2 else current_chunk[-1:]
-                current_chunk = overlap_sentences
-                current_length = sum(len(s.split()) for s in overlap_sentences)
+                current_chunk_indices = current_chunk_indices[-2:]
+                current_length = sum(sent_word_counts[i] for i in current_chunk_indices)
             
-            current_chunk.append(sentence)
+            current_chunk_indices.append(idx)
             current_length += sentence_length
         
         # Add the final chunk
-        if current_chunk:
-            chunk_text = ' '.join(current_chunk)
+        if current_chunk_indices:
+            chunk_text = ' '.join(sentences[i] for i in current_chunk_indices)
             chunks.append({
                 'content': chunk_text,
-                'metadata': document['metadata'],
-                'chunk_id': f"{document['metadata']['title']}_{len(chunks)}"
+                'doc_id': doc_id
             })
         
         return chunks
\ No newline at end of file
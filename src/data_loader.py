@@ -1,4 +1,4 @@
-import json
+import ijson
 import os
 from typing import List, Dict, Any
 from .config import Config
@@ -9,42 +9,44 @@ class DataLoader:
     
     def load_and_preprocess(self) -> List[Dict[str, Any]]:
         """Load and preprocess movie data"""
+        processed_movies = []
         try:
-            with open(self.config.DATA_PATH, 'r', encoding='utf-8') as f:
-                movies = json.load(f)
+            # Stream records so only the first MAX_DOCUMENTS are ever parsed
+            with open(self.config.DATA_PATH, 'rb') as f:
+                for i, movie in enumerate(ijson.items(f, 'item', use_float=True)):
+                    if i >= self.config.MAX_DOCUMENTS:
+                        break
+                    
+                    if 'extract' in movie and movie['extract']:
+                        processed_movies.append(self._preprocess(movie))
         except FileNotFoundError:
             print(f"Error: Data file {self.config.DATA_PATH} not found.")
             print("Please make sure you have run the filtering script and the file exists.")
             return []
         
-        # Limit to max documents
-        movies = movies[:self.config.MAX_DOCUMENTS]
+        print(f"Processed {len(processed_movies)} movies with substantial content")
+        return processed_movies
+    
+    def _preprocess(self, movie: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine title and extract for better context"""
+        # Create enhanced content with more context
+        year = movie.get('year', 'Unknown')
+        genres = movie.get('genres', [])
+        title = movie.get('title', 'Unknown')
         
-        # Preprocess: combine title and extract for better context
-        processed_movies = []
-        for movie in movies:
-            if 'extract' in movie and movie['extract']:
-                # Create enhanced content with more context
-                year = movie.get('year', 'Unknown')
-                genres = movie.get('genres', [])
-                title = movie.get('title', 'Unknown')
-                
-                content = f"Movie: {title}. Year: {year}. "
-                if genres:
-                    content += f"Genres: {', '.join(genres)}. "
-                content += f"Plot: {movie['extract']}"
-                
-                processed_movies.append({
-                    'title': title,
-                    'year': year,
-                    'content': content,
-                    'genres': genres,
-                    'metadata': {
-                        'year': year,
-                        'genres': genres,
-                        'title': title
-                    }
-                })
+        content = f"Movie: {title}. Year: {year}. "
+        if genres:
+            content += f"Genres: {', '.join(genres)}. "
+        content += f"Plot: {movie['extract']}"
         
-        print(f"Processed {len(processed_movies)} movies with substantial content")
-        return processed_movies
\ No newline at end of file
+        return {
+            'title': title,
+            'year': year,
+            'content': content,
+            'genres': genres,
+            'metadata': {
+                'year': year,
+                'genres': genres,
+                'title': title
+            }
+        }
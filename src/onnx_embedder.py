@@ -0,0 +1,75 @@
+import numpy as np
+from typing import List
+import os
+import torch
+from .config import Config
+
+class OnnxEmbedder:
+    """INT8-quantized ONNX Runtime drop-in for the SentenceTransformer encode() path"""
+
+    QUANTIZED_FILE = "model_quantized.onnx"
+
+    def __init__(self, config: Config):
+        # Optional dependency: only needed when USE_ONNX is enabled
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        self.config = config
+        self.device = torch.device("cpu")
+        self.max_seq_length = config.ONNX_MAX_SEQ_LENGTH
+
+        model_dir = os.path.join(config.VECTOR_DB_PATH, "onnx", config.EMBEDDING_MODEL.replace('/', '_'))
+        quantized_dir = os.path.join(model_dir, "int8")
+
+        if not os.path.exists(os.path.join(quantized_dir, self.QUANTIZED_FILE)):
+            print("Exporting embedding model to ONNX (one-time)...")
+            model = ORTModelForFeatureExtraction.from_pretrained(
+                config.EMBEDDING_MODEL, export=True, provider="CPUExecutionProvider"
+            )
+            model.save_pretrained(model_dir)
+
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=quantized_dir, quantization_config=quantization_config)
+
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            quantized_dir, file_name=self.QUANTIZED_FILE, provider="CPUExecutionProvider"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True) -> np.ndarray:
+        """Tokenize, run ONNX Runtime, mean-pool and L2-normalize (same output as SentenceTransformer)"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        # Sort by length so each batch pads to similar lengths, then restore input order
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        batches = []
+
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            inputs = self.tokenizer(
+                batch, padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np"
+            )
+            outputs = self.model(**inputs)
+            token_embeddings = np.asarray(outputs.last_hidden_state, dtype=np.float32)
+
+            # Mean pooling over non-padding tokens
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(summed / counts)
+
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if batches:
+            embeddings[order] = np.vstack(batches)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.clip(norms, 1e-12, None)
+        return embeddings
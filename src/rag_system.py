@@ -1,10 +1,13 @@
 import google.generativeai as genai
+import asyncio
 import json
 import os
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from .data_loader import DataLoader
 from .chunker import SmartChunker
 from .vector_store import VectorStore
+from .semantic_cache import SemanticCache
 from .config import Config
 
 class MovieRAGSystem:
@@ -13,7 +16,9 @@ class MovieRAGSystem:
         self.data_loader = DataLoader(config)
         self.chunker = SmartChunker(config)
         self.vector_store = VectorStore(config)
+        self.cache = SemanticCache(config) if config.CACHE_ENABLED else None
         self.initialized = False
+        self._init_lock = threading.Lock()
         
         # Initialize Gemini (will prompt for API key if needed)
         api_key = config.API_KEY
@@ -31,6 +36,8 @@ class MovieRAGSystem:
         
         # Try to load existing vector store first
         if self.vector_store.load_index():
+            if self.cache is not None:
+                self.cache.load()
             self.initialized = True
             return True
         
@@ -46,50 +53,129 @@ class MovieRAGSystem:
         chunks = self.chunker.chunk_documents(documents)
         
         print("Building vector index...")
-        self.vector_store.build_index(chunks)
+        self.vector_store.build_index(chunks, documents)
+        
+        # Cached answers were produced against the previous index
+        if self.cache is not None:
+            self.cache.clear()
         
         self.initialized = True
         print(f"RAG system initialized with {len(chunks)} chunks from {len(documents)} movies")
         return True
     
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """Chunk and index additional (preprocessed) documents without rebuilding the store"""
+        if not self.initialized and not self.initialize():
+            return 0
+        
+        chunks = self.chunker.chunk_documents(documents)
+        self.vector_store.add_chunks(chunks, documents)
+        
+        # Cached answers may no longer reflect the full corpus
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return len(chunks)
+    
     def query(self, question: str) -> Dict[str, Any]:
         """Process a query and return structured response"""
-        if not self.initialized:
-            success = self.initialize()
+        early_response, query_embedding, retrieved_chunks, prompt = self._prepare_query(question)
+        if early_response is not None:
+            return early_response
+        
+        answer = None
+        if self.llm:
+            try:
+                response = self.llm.generate_content(prompt)
+                answer = response.text.strip()
+            except Exception as e:
+                print(f"Error calling Gemini API: {e}")
+        
+        result = self._finish_query(question, retrieved_chunks, answer)
+        
+        # Only cache LLM answers; fallback answers are cheap to regenerate
+        if answer is not None:
+            self._cache_result(query_embedding, retrieved_chunks, result)
+        
+        return result
+    
+    async def query_async(self, question: str) -> Dict[str, Any]:
+        """Async variant of query() so several LLM calls can be in flight at once"""
+        # Embedding and FAISS search are blocking, so keep them off the event loop
+        early_response, query_embedding, retrieved_chunks, prompt = await asyncio.to_thread(
+            self._prepare_query, question
+        )
+        if early_response is not None:
+            return early_response
+        
+        answer = None
+        if self.llm:
+            try:
+                response = await self.llm.generate_content_async(prompt)
+                answer = response.text.strip()
+            except Exception as e:
+                print(f"Error calling Gemini API: {e}")
+        
+        result = self._finish_query(question, retrieved_chunks, answer)
+        
+        # Only cache LLM answers; fallback answers are cheap to regenerate
+        if answer is not None:
+            await asyncio.to_thread(self._cache_result, query_embedding, retrieved_chunks, result)
+        
+        return result
+    
+    def _prepare_query(self, question: str) -> Tuple[Optional[Dict[str, Any]], Any, List, Optional[str]]:
+        """Retrieve context for a question and build the LLM prompt.
+        
+        Returns (early_response, query_embedding, retrieved_chunks, prompt); early_response is
+        set when the query can be answered without the LLM (errors, cache hits, no results).
+        """
+        # Concurrent async queries may reach this from several worker threads
+        with self._init_lock:
+            success = self.initialized or self.initialize()
             if not success:
                 return {
                     "answer": "System initialization failed. Please check your data file.",
                     "contexts": [],
                     "reasoning": "Initialization error"
-                }
+                }, None, [], None
+        
+        # Embed once; the embedding is shared by the cache lookup and the search
+        query_embedding = self.vector_store.embed_query(question)
+        
+        # Answer near-duplicate questions from the semantic cache
+        if self.cache is not None:
+            cached = self.cache.lookup(query_embedding, self.config.CACHE_THRESHOLD)
+            if cached is not None:
+                if self.config.VERBOSE:
+                    print("Answered from semantic cache")
+                # The stored reasoning quotes the original question, so rebuild it for this one
+                result = dict(cached['result'])
+                result['reasoning'] = self._build_reasoning(question, cached['num_chunks'], cached['top_movies'])
+                return result, query_embedding, [], None
         
         # Retrieve relevant chunks
-        retrieved_chunks = self.vector_store.search(question, top_k=5)
+        retrieved_chunks = self.vector_store.search(question, top_k=5, embedding=query_embedding)
         
-        print(f"🔎 Retrieved {len(retrieved_chunks)} relevant chunks")
+        if self.config.VERBOSE:
+            print(f"🔎 Retrieved {len(retrieved_chunks)} relevant chunks")
         
         if not retrieved_chunks:
             return {
                 "answer": "I couldn't find relevant information about this topic in the movie plots database.",
                 "contexts": [],
                 "reasoning": "No relevant movie plot information was found for the query."
-            }
+            }, query_embedding, [], None
         
         # Prepare context
-        contexts = [chunk['content'] for chunk, score in retrieved_chunks]
+        contexts = [text for text, metadata, score in retrieved_chunks]
         context_text = "\n\n".join(contexts)
         
-        # Generate answer
-        prompt = self._build_prompt(question, context_text)
-        
-        if self.llm:
-            try:
-                response = self.llm.generate_content(prompt)
-                answer = response.text.strip()
-            except Exception as e:
-                print(f"Error calling Gemini API: {e}")
-                answer = self._generate_fallback_answer(question, retrieved_chunks)
-        else:
+        return None, query_embedding, retrieved_chunks, self._build_prompt(question, context_text)
+    
+    def _finish_query(self, question: str, retrieved_chunks: List, answer: Optional[str]) -> Dict[str, Any]:
+        """Assemble the response, falling back to a keyword answer if the LLM gave none"""
+        if answer is None:
             answer = self._generate_fallback_answer(question, retrieved_chunks)
         
         # Generate reasoning
@@ -97,10 +183,20 @@ class MovieRAGSystem:
         
         return {
             "answer": answer,
-            "contexts": contexts,
+            "contexts": [text for text, metadata, score in retrieved_chunks],
             "reasoning": reasoning
         }
     
+    def _cache_result(self, query_embedding, retrieved_chunks: List, result: Dict[str, Any]):
+        """Store a response with what is needed to rebuild its reasoning for similar questions"""
+        if self.cache is None:
+            return
+        self.cache.add(query_embedding, {
+            "result": result,
+            "num_chunks": len(retrieved_chunks),
+            "top_movies": self._top_movies(retrieved_chunks)
+        })
+    
     def _build_prompt(self, question: str, context: str) -> str:
         """Build the prompt for the LLM"""
         return f"""Based on the following movie plot information, answer the question. Be specific and reference the relevant movies.
@@ -116,7 +212,8 @@ Answer:"""
     
     def _generate_fallback_answer(self, question: str, retrieved_chunks: List) -> str:
         """Generate answer without LLM"""
-        movie_titles = list(set([chunk['metadata']['title'] for chunk, score in retrieved_chunks]))
+        # Deduplicate while keeping retrieval rank order
+        movie_titles = list({metadata['title']: None for text, metadata, score in retrieved_chunks})
         
         # Simple keyword-based answer generation
         question_lower = question.lower()
@@ -136,20 +233,22 @@ Answer:"""
         else:
             return f"Based on movie plots including {', '.join(movie_titles[:3])}. The plots discuss various themes related to your question."
     
+    def _top_movies(self, retrieved_chunks: List) -> List[str]:
+        """Titles of the top 3 chunks, deduplicated in rank order"""
+        return list({metadata['title']: None for text, metadata, score in retrieved_chunks[:3]})
+    
     def _generate_reasoning(self, question: str, retrieved_chunks: List) -> str:
         """Generate reasoning for the retrieval and answer process"""
-        top_movies = []
-        for chunk, score in retrieved_chunks[:3]:
-            title = chunk['metadata']['title']
-            if title not in top_movies:
-                top_movies.append(title)
-        
+        return self._build_reasoning(question, len(retrieved_chunks), self._top_movies(retrieved_chunks))
+    
+    def _build_reasoning(self, question: str, num_chunks: int, top_movies: List[str]) -> str:
+        """Reasoning text for a question answered from num_chunks retrieved chunks"""
         if not top_movies:
             return "No relevant movie plot information was found for the query."
         
         reasoning_parts = [
             f"The question was about '{question}'.",
-            f"I searched through movie plots and found relevant information from {len(retrieved_chunks)} chunks.",
+            f"I searched through movie plots and found relevant information from {num_chunks} chunks.",
             f"The most relevant movies were: {', '.join(top_movies)}.",
             "I used these plot details to form a comprehensive answer."
         ]
@@ -0,0 +1,128 @@
+import numpy as np
+from typing import List, Dict, Any, Optional
+import faiss
+import pickle
+import os
+import threading
+from .config import Config
+
+class SemanticCache:
+    """Cache of query responses keyed by (normalized) query embedding.
+
+    Entries are persisted as an append-only log of pickled records, so adding an
+    entry costs one small write; the lookup index is rebuilt from the log on load.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.index = None
+        self.embeddings: List[np.ndarray] = []
+        self.responses: List[Dict[str, Any]] = []
+        # Lookups and adds may run concurrently in worker threads
+        self._lock = threading.Lock()
+        # Serializes appends to the log without holding up lookups
+        self._write_lock = threading.Lock()
+        self.data_path = os.path.join(config.VECTOR_DB_PATH, "cache.pkl")
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def load(self) -> bool:
+        """Load a previously saved cache if available"""
+        if not os.path.exists(self.data_path):
+            return False
+
+        embeddings, responses = [], []
+        good_end = 0
+        try:
+            with open(self.data_path, 'rb') as f:
+                while True:
+                    try:
+                        record = pickle.load(f)
+                    except EOFError:
+                        break
+                    embeddings.append(record['embedding'])
+                    responses.append(record['response'])
+                    good_end = f.tell()
+        except Exception as e:
+            print(f"Error loading semantic cache: {e}")
+
+        # Drop a torn or corrupt tail (e.g. a crash mid-append); otherwise later
+        # appends would land behind it and be unreadable on the next load
+        if os.path.getsize(self.data_path) != good_end:
+            print("Discarding corrupt trailing data in semantic cache")
+            with self._write_lock, open(self.data_path, 'r+b') as f:
+                f.truncate(good_end)
+
+        with self._lock:
+            self.index = None
+            self.embeddings = []
+            self.responses = []
+            for embedding, response in zip(embeddings, responses):
+                self._add_entry(embedding[None, :], response)
+
+        print(f"Loaded semantic cache with {len(self.responses)} entries")
+        return bool(self.responses)
+
+    def clear(self):
+        """Drop all cached responses (e.g. after the vector store was rebuilt)"""
+        with self._lock, self._write_lock:
+            self.index = None
+            self.embeddings = []
+            self.responses = []
+            if os.path.exists(self.data_path):
+                os.remove(self.data_path)
+
+    def lookup(self, query_embedding: np.ndarray, threshold: float = None) -> Optional[Dict[str, Any]]:
+        """Return the cached response for the closest query if it is similar enough"""
+        if threshold is None:
+            threshold = self.config.CACHE_THRESHOLD
+
+        with self._lock:
+            if self.index is None or not self.responses:
+                return None
+
+            # LSH only ranks candidates by Hamming distance, so re-score them exactly
+            search_k = min(self.config.CACHE_LSH_CANDIDATES, len(self.responses))
+            _, indices = self.index.search(np.ascontiguousarray(query_embedding, dtype=np.float32), search_k)
+
+            best_idx, best_score = -1, threshold
+            for idx in indices[0]:
+                if idx < 0:
+                    continue
+                score = float(np.dot(self.embeddings[idx], query_embedding[0]))
+                if score >= best_score:
+                    best_idx, best_score = idx, score
+
+            if best_idx < 0:
+                return None
+            return dict(self.responses[best_idx])
+
+    def add(self, query_embedding: np.ndarray, response: Dict[str, Any]):
+        """Store a response for the given query embedding and append it to the log"""
+        embedding = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        response = dict(response)
+
+        with self._lock:
+            self._add_entry(embedding, response)
+
+        # Disk I/O happens outside the lookup lock
+        with self._write_lock:
+            os.makedirs(self.config.VECTOR_DB_PATH, exist_ok=True)
+            with open(self.data_path, 'ab') as f:
+                pickle.dump({'embedding': embedding[0], 'response': response}, f)
+
+    def _add_entry(self, embedding: np.ndarray, response: Dict[str, Any]):
+        """Add one (1, d) embedding to the in-memory index; caller holds the lock"""
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(embedding.shape[1])
+
+        self.index.add(embedding)
+        self.embeddings.append(embedding[0])
+        self.responses.append(response)
+
+        # Switch to random-projection LSH once exhaustive lookups get expensive
+        if (len(self.responses) >= self.config.CACHE_LSH_MIN_ENTRIES and
+                not isinstance(self.index, faiss.IndexLSH)):
+            self.index = faiss.IndexLSH(embedding.shape[1], self.config.CACHE_LSH_BITS)
+            self.index.add(np.vstack(self.embeddings))
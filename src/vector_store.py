@@ -3,80 +3,251 @@ from typing import List, Dict, Any, Tuple
 import faiss
 import pickle
 import os
+import re
+import threading
+import torch
+from rank_bm25 import BM25Okapi
 from sentence_transformers import SentenceTransformer
 from .config import Config
+from .chunk_store import save_chunks, load_chunks, save_documents, load_documents
+
+TOKEN_RE = re.compile(r'\w+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens for BM25"""
+    return TOKEN_RE.findall(text.lower())
 
 class VectorStore:
     def __init__(self, config: Config):
         self.config = config
-        self.embedding_model = SentenceTransformer(config.EMBEDDING_MODEL)
+        self._configure_threads()
+        self.embedding_model = self._load_embedding_model()
+        # The HF fast tokenizer is not safe to call from several threads at once
+        # ("Already borrowed"), and async queries embed from worker threads
+        self._encode_lock = threading.Lock()
+        if config.EMBED_MAX_SEQ_LENGTH:
+            self.embedding_model.max_seq_length = config.EMBED_MAX_SEQ_LENGTH
+        if not getattr(self.embedding_model.tokenizer, 'is_fast', True):
+            print("Warning: embedding model uses a slow (Python) tokenizer")
         self.index = None
-        self.chunks = []
-        self.chunk_metadata = []
+        self.bm25 = None
+        # Chunks are stored column-wise; metadata is kept once per document
+        self.chunk_texts = []
+        self.chunk_doc_ids = np.empty(0, dtype=np.int32)
+        self.documents = []
+    
+    def _configure_threads(self):
+        """Pin torch CPU threading to physical cores instead of relying on library defaults"""
+        num_threads = self.config.NUM_THREADS or max(1, (os.cpu_count() or 8) // 2)
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(2)
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            pass
     
-    def build_index(self, chunks: List[Dict[str, Any]]):
+    def _load_embedding_model(self):
+        """Load the quantized ONNX encoder if enabled, falling back to PyTorch"""
+        if self.config.USE_ONNX:
+            try:
+                from .onnx_embedder import OnnxEmbedder
+                return OnnxEmbedder(self.config)
+            except Exception as e:
+                print(f"Could not load ONNX embedder, using PyTorch: {e}")
+        
+        return SentenceTransformer(self.config.EMBEDDING_MODEL, device=self._detect_device())
+    
+    def _detect_device(self) -> str:
+        """Pick the fastest available device for embedding, unless overridden in config"""
+        if self.config.EMBED_DEVICE:
+            return self.config.EMBED_DEVICE
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+    
+    def _batch_size(self) -> int:
+        """Batch size for bulk embedding; accelerators benefit from larger batches"""
+        if self.config.EMBED_BATCH_SIZE:
+            return self.config.EMBED_BATCH_SIZE
+        return 64 if self.embedding_model.device.type == "cpu" else 128
+    
+    def build_index(self, chunks: List[Dict[str, Any]], documents: List[Dict[str, Any]]):
         """Build FAISS index from chunks and save it"""
-        self.chunks = chunks
-        self.chunk_metadata = [chunk['metadata'] for chunk in chunks]
+        self.documents = [doc['metadata'] for doc in documents]
+        self.chunk_texts = [chunk['content'] for chunk in chunks]
+        self.chunk_doc_ids = np.array([chunk['doc_id'] for chunk in chunks], dtype=np.int32)
         
-        # Generate embeddings
-        texts = [chunk['content'] for chunk in chunks]
         print("Generating embeddings...")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
+        embeddings = self._embed_texts(self.chunk_texts)
         
-        # Create FAISS index
+        # Create FAISS index; ids are chunk positions so chunks can be appended later
         dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
+        self.index = faiss.IndexIDMap2(self._create_index(dimension, len(chunks)))
+        if not self.index.is_trained:
+            self.index.train(embeddings)
+        self.index.add_with_ids(embeddings, np.arange(len(chunks), dtype=np.int64))
         
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings.astype(np.float32))
+        # Sparse keyword index over the same chunks for hybrid search
+        self.bm25 = BM25Okapi([tokenize(text) for text in self.chunk_texts])
         
         # Save the index and metadata
         self._save_index()
         
         print(f"Built FAISS index with {len(chunks)} chunks")
     
+    def add_chunks(self, chunks: List[Dict[str, Any]], documents: List[Dict[str, Any]]):
+        """Append new chunks to the existing index without re-embedding the corpus.
+        
+        Chunk doc_ids refer to positions in the given (new) documents list.
+        """
+        if not chunks:
+            return
+        
+        if self.index is None:
+            self.build_index(chunks, documents)
+            return
+        
+        next_id = len(self.chunk_texts)
+        doc_offset = len(self.documents)
+        new_texts = [chunk['content'] for chunk in chunks]
+        
+        print("Generating embeddings...")
+        embeddings = self._embed_texts(new_texts)
+        self.index.add_with_ids(embeddings, np.arange(next_id, next_id + len(chunks), dtype=np.int64))
+        
+        self.documents = list(self.documents) + [doc['metadata'] for doc in documents]
+        self.chunk_texts = list(self.chunk_texts) + new_texts
+        self.chunk_doc_ids = np.concatenate([
+            self.chunk_doc_ids,
+            np.array([chunk['doc_id'] + doc_offset for chunk in chunks], dtype=np.int32)
+        ])
+        
+        # BM25 has no incremental update, but rebuilding it only tokenizes text
+        self.bm25 = BM25Okapi([tokenize(text) for text in self.chunk_texts])
+        
+        self._save_index()
+        
+        print(f"Added {len(chunks)} chunks to FAISS index ({len(self.chunk_texts)} total)")
+    
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in bulk and L2-normalize them for cosine similarity"""
+        # encode() sorts texts by length before batching, so each batch pads only to similar lengths
+        with self._encode_lock, torch.inference_mode():
+            embeddings = self.embedding_model.encode(
+                texts,
+                batch_size=self._batch_size(),
+                convert_to_numpy=True,
+                show_progress_bar=self.config.VERBOSE
+            )
+        
+        # Normalize in place; no copy if already contiguous float32
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _scalar_quantizer_type(self):
+        """Map INDEX_STORAGE to a FAISS scalar quantizer type (None = full float32)"""
+        storage = self.config.INDEX_STORAGE
+        if storage == "fp32":
+            return None
+        if storage == "fp16":
+            return faiss.ScalarQuantizer.QT_fp16
+        if storage == "8bit":
+            return faiss.ScalarQuantizer.QT_8bit
+        raise ValueError(f"Unknown INDEX_STORAGE: {storage}")
+    
+    def _create_index(self, dimension: int, num_vectors: int) -> faiss.Index:
+        """Create an empty FAISS index suited to the corpus size"""
+        qtype = self._scalar_quantizer_type()
+        
+        # Brute-force search is fast enough (and much cheaper to build) for small corpora
+        if num_vectors < self.config.HNSW_MIN_CHUNKS:
+            if qtype is None:
+                return faiss.IndexFlatIP(dimension)
+            return faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+        
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dimension, self.config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, qtype, self.config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.config.HNSW_EF_CONSTRUCTION
+        return index
+    
+    def _hnsw(self):
+        """HNSW graph of the (ID-mapped) index, or None for flat indexes"""
+        index = self.index
+        if isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+        return getattr(index, 'hnsw', None)
+    
     def load_index(self) -> bool:
         """Load existing FAISS index if available"""
         index_path = os.path.join(self.config.VECTOR_DB_PATH, "index.faiss")
-        metadata_path = os.path.join(self.config.VECTOR_DB_PATH, "metadata.pkl")
+        chunks_path = os.path.join(self.config.VECTOR_DB_PATH, "chunks.arrow")
+        documents_path = os.path.join(self.config.VECTOR_DB_PATH, "documents.arrow")
         
-        if os.path.exists(index_path) and os.path.exists(metadata_path):
+        if all(os.path.exists(path) for path in (index_path, chunks_path, documents_path)):
             try:
                 self.index = faiss.read_index(index_path)
-                with open(metadata_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.chunks = data['chunks']
-                    self.chunk_metadata = data['metadata']
+                self.chunk_texts, self.chunk_doc_ids = load_chunks(chunks_path)
+                self.documents = load_documents(documents_path)
+                self.bm25 = self._load_bm25()
                 
-                print(f"Loaded existing vector store with {len(self.chunks)} chunks")
+                print(f"Loaded existing vector store with {len(self.chunk_texts)} chunks")
                 return True
             except Exception as e:
                 print(f"Error loading vector store: {e}")
                 return False
         return False
     
+    def _load_bm25(self) -> BM25Okapi:
+        """Load the persisted BM25 index, rebuilding it from the chunks if missing"""
+        bm25_path = os.path.join(self.config.VECTOR_DB_PATH, "bm25.pkl")
+        if os.path.exists(bm25_path):
+            with open(bm25_path, 'rb') as f:
+                return pickle.load(f)
+        return BM25Okapi([tokenize(text) for text in self.chunk_texts])
+    
     def _save_index(self):
-        """Save FAISS index and metadata"""
+        """Save FAISS index and chunks"""
         os.makedirs(self.config.VECTOR_DB_PATH, exist_ok=True)
         
         # Save FAISS index
         index_path = os.path.join(self.config.VECTOR_DB_PATH, "index.faiss")
         faiss.write_index(self.index, index_path)
         
-        # Save metadata
-        metadata_path = os.path.join(self.config.VECTOR_DB_PATH, "metadata.pkl")
-        with open(metadata_path, 'wb') as f:
-            pickle.dump({
-                'chunks': self.chunks,
-                'metadata': self.chunk_metadata
-            }, f)
+        # Save chunks column-wise for memory-mapped loading, and document metadata once
+        chunks_path = os.path.join(self.config.VECTOR_DB_PATH, "chunks.arrow")
+        save_chunks(chunks_path, self.chunk_texts, self.chunk_doc_ids)
+        documents_path = os.path.join(self.config.VECTOR_DB_PATH, "documents.arrow")
+        save_documents(documents_path, self.documents)
+        
+        # Save BM25 index
+        bm25_path = os.path.join(self.config.VECTOR_DB_PATH, "bm25.pkl")
+        with open(bm25_path, 'wb') as f:
+            pickle.dump(self.bm25, f)
         
         print(f"Vector store saved to {self.config.VECTOR_DB_PATH}")
     
-    def search(self, query: str, top_k: int = None) -> List[Tuple[Dict[str, Any], float]]:
-        """Search for similar chunks"""
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a single query as a normalized (1, d) float32 array"""
+        with self._encode_lock, torch.inference_mode():
+            query_embedding = np.ascontiguousarray(
+                self.embedding_model.encode([query], convert_to_numpy=True, show_progress_bar=False), dtype=np.float32
+            )
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+    
+    def search(self, query: str, top_k: int = None, embedding: np.ndarray = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Search for similar chunks, reusing a precomputed query embedding if given.
+        
+        Returns (chunk text, document metadata, score) tuples where score is always the
+        cosine similarity to the query. With HYBRID_SEARCH, results are ordered by their
+        fused dense + BM25 rank, and BM25 candidates must pass SIMILARITY_THRESHOLD just
+        like dense ones. If nothing passes, the top dense hits are returned regardless.
+        """
         if top_k is None:
             top_k = self.config.TOP_K
         
@@ -84,26 +255,66 @@ class VectorStore:
             print("Index not built yet.")
             return []
         
-        # Generate query embedding
-        query_embedding = self.embedding_model.encode([query])
-        faiss.normalize_L2(query_embedding)
+        query_embedding = embedding if embedding is not None else self.embed_query(query)
         
         # Search for more results initially to ensure we get some
-        search_k = min(top_k * 3, len(self.chunks))
-        scores, indices = self.index.search(query_embedding.astype(np.float32), search_k)
+        search_k = min(top_k * 3, len(self.chunk_texts))
+        # Per-call search parameters, so concurrent searches never mutate the shared index
+        params = None
+        if self._hnsw() is not None:
+            params = faiss.SearchParametersHNSW(efSearch=max(self.config.HNSW_EF_SEARCH, search_k * 4))
+        scores, indices = self.index.search(
+            np.ascontiguousarray(query_embedding, dtype=np.float32), search_k, params=params
+        )
         
-        results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.chunks) and score >= self.config.SIMILARITY_THRESHOLD:
-                results.append((self.chunks[idx], float(score)))
+        # Mask out padding ids (-1); keep marks dense hits that pass the similarity threshold
+        ids, dists = indices[0], scores[0]
+        in_range = (ids >= 0) & (ids < len(self.chunk_texts))
+        keep = np.where(in_range & (dists >= self.config.SIMILARITY_THRESHOLD))[0]
+        
+        if self.config.HYBRID_SEARCH and self.bm25 is not None:
+            dense_ids = ids[in_range].tolist()
+            fused_ids = [idx for idx, _ in self._fuse_with_bm25(query, dense_ids, search_k)]
+            
+            # Score every fused candidate by cosine so one threshold applies to both sources
+            cosine = dict(zip(dense_ids, dists[in_range].tolist()))
+            missing = [idx for idx in fused_ids if idx not in cosine]
+            if missing:
+                vectors = np.vstack([self.index.reconstruct(idx) for idx in missing])
+                cosine.update(zip(missing, (vectors @ query_embedding[0]).tolist()))
             
-            if len(results) >= top_k:
-                break
+            results = [
+                self._result(idx, float(cosine[idx])) for idx in fused_ids
+                if cosine[idx] >= self.config.SIMILARITY_THRESHOLD
+            ][:top_k]
+        else:
+            results = [self._result(ids[i], float(dists[i])) for i in keep[:top_k]]
+        
+        # If no results meet threshold, return the top ones anyway (FAISS already sorts by score)
+        if not results:
+            results = [self._result(ids[i], float(dists[i])) for i in np.where(in_range)[0][:top_k]]
+        
+        return results
+    
+    def _result(self, idx: int, score: float) -> Tuple[str, Dict[str, Any], float]:
+        return self.chunk_texts[idx], self.documents[self.chunk_doc_ids[idx]], score
+    
+    def _fuse_with_bm25(self, query: str, dense_ids: List[int], search_k: int) -> List[Tuple[int, float]]:
+        """Combine dense and BM25 rankings with weighted Reciprocal Rank Fusion.
+        
+        Returns (chunk index, fused RRF score) pairs, best first; the RRF score is only
+        used for ordering. Only chunks sharing at least one term with the query are taken
+        from the BM25 ranking.
+        """
+        bm25_scores = self.bm25.get_scores(tokenize(query))
+        bm25_ids = np.argsort(-bm25_scores)[:search_k]
+        bm25_ids = [int(idx) for idx in bm25_ids if bm25_scores[idx] > 0]
         
-        # If no results meet threshold, return the top ones anyway
-        if not results and len(indices[0]) > 0:
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                if idx < len(self.chunks) and i < top_k:
-                    results.append((self.chunks[idx], float(score)))
+        k = self.config.RRF_K
+        fused = {}
+        for rank, idx in enumerate(dense_ids):
+            fused[idx] = fused.get(idx, 0.0) + self.config.DENSE_WEIGHT / (k + rank + 1)
+        for rank, idx in enumerate(bm25_ids):
+            fused[idx] = fused.get(idx, 0.0) + self.config.BM25_WEIGHT / (k + rank + 1)
         
-        return results
\ No newline at end of file
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)